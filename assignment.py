@@ -53,9 +53,21 @@ assignment. However, even though the assignment itself is quite basic, we would
 would structure your code to make it easily readable, so others can trust it works as intended.
 """
 import abc
+import codecs
 import csv
+import mmap
+import os
+import re
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
 from enum import Enum, auto
-from typing import Tuple, Optional, Dict, Iterator, Any, TextIO, List, Union
+from functools import partial
+from hashlib import blake2b
+from itertools import chain, islice
+from typing import (
+    Tuple, Optional, Dict, Iterator, Any, TextIO, List, Callable, Sequence, AnyStr, BinaryIO, Pattern,
+)
 
 
 class Operation(Enum):
@@ -83,81 +95,489 @@ class ProductStreamProcessor(metaclass=abc.ABCMeta):
         ...
 
 
+Headers = Tuple[str, ...]
+# Rows hold str cells, or bytes cells when the csv files are read with `fast_ascii`.
+Row = Tuple[AnyStr, ...]
+RawOperation = Tuple[Operation, AnyStr, Optional[Row]]
+
+
 class ProductDiffer(ProductStreamProcessor):
     """
     Implement this class to create a simple product differ.
     """
-    @staticmethod
-    def convert_data_from_csv(csv_products, headers) -> List[Dict[str, Dict[str, Any]]]:
-        """
-        Converts the data from the CSV file to a list of dictionaries.
+    ID_COLUMN: str = 'id'
+    # Columns with more distinct values than this (e.g. ids or titles) are no
+    # longer interned, as sharing their values would not save any memory.
+    MAX_INTERNED_VALUES: int = 1024
+    # Read the csv files in large chunks to reduce the number of read calls.
+    BUFFER_SIZE: int = 1 << 20
+    # The number of after products used to infer the type of each column.
+    TYPE_SAMPLE_SIZE: int = 100
+    # Only values that are written exactly like Python writes them are parsed,
+    # so e.g. zip codes with a leading zero and -0 are kept as text.
+    INT_PATTERN: Pattern = re.compile(r'0|-?[1-9][0-9]*')
+    FLOAT_PATTERN: Pattern = re.compile(r'0|-?[1-9][0-9]*|-?(?:0|[1-9][0-9]*)\.[0-9]+')
 
-        :param csv_products: The CSV file reader
-        :param headers: The headers of the CSV file
-        :return: A list of dictionaries with the data from the CSV file
+    def __init__(
+        self,
+        path_to_before_csv: str,
+        path_to_after_csv: str,
+        sorted_input: bool = False,
+        fast_ascii: bool = False,
+    ):
         """
-        products: List[Dict[str, Dict[str, Any]]] = []
-        headers_cnt: int = len(headers)
-        for product in csv_products:
-            product_data = dict(
-                data={},
-                id=product[0],
-            )
-            for idx in range(headers_cnt):
-                product_data['data'][headers[idx]] = product[idx]
-            products.append(product_data)
-        return products
+        :param path_to_before_csv: the path to the before csv file
+        :param path_to_after_csv: the path to the after csv file
+        :param sorted_input: whether both csv files are sorted by id, which
+            allows diffing them without loading either of them in memory
+        :param fast_ascii: whether to memory-map the csv files and split them on
+            plain commas, only decoding the emitted products; this falls back to
+            the csv module if any value is quoted
+        """
+        super().__init__(path_to_before_csv, path_to_after_csv)
+        self.sorted_input = sorted_input
+        self.fast_ascii = fast_ascii
 
-    @staticmethod
-    def find_suitable_product(products: List[Dict[str, Dict[str, Any]]], match_id: int):
+    def open_csv_file(self, path: str) -> TextIO:
         """
-        Finds a product in the list of products that matches the id.
+        Opens a csv file for reading. Newline translation is left to the csv
+        module, as it recommends, which also handles newlines inside quoted values.
+        A leading UTF-8 byte order mark, as written by e.g. Excel, is skipped.
 
-        :param products: list of products
-        :param match_id: id to match
-        :return: product that matches the id
+        :param path: the path to the csv file
+        :return: the opened csv file
         """
-        for product in products:
-            if product['id'] == match_id:
-                return product
-        return None
+        return open(path, 'r', buffering=self.BUFFER_SIZE, newline='', encoding='utf-8-sig')
 
     @staticmethod
-    def init_file_readers(before_csv_file: TextIO, after_csv_file: TextIO) -> Tuple[csv.reader, csv.reader]:
+    def init_file_readers(
+        before_csv_file: TextIO,
+        after_csv_file: TextIO,
+    ) -> Tuple[Iterator[List[str]], Iterator[List[str]]]:
         """
         Initializes the csv.reader objects for the before and after csv files.
+        Empty lines are skipped, like in the `fast_ascii` path.
 
         :param before_csv_file: the before csv file
         :param after_csv_file: the after csv file
         :return: the before and after csv.reader objects
         """
-        before_csv_reader: csv.reader = csv.reader(before_csv_file)
-        after_csv_reader: csv.reader = csv.reader(after_csv_file)
+        before_csv_reader: Iterator[List[str]] = filter(None, csv.reader(before_csv_file))
+        after_csv_reader: Iterator[List[str]] = filter(None, csv.reader(after_csv_file))
         return before_csv_reader, after_csv_reader
 
+    @staticmethod
+    def map_csv_file(csv_file: BinaryIO) -> Optional[mmap.mmap]:
+        """
+        Memory-maps a csv file if it can be split on plain commas, i.e. when it
+        is not empty, none of its values are quoted and all of its lines end
+        with a newline (a carriage return on its own ends a line for the csv
+        module, but not for readline).
+
+        :param csv_file: the csv file, opened in binary mode
+        :return: the memory-mapped csv file, or None if it cannot be split on plain commas
+        """
+        if os.fstat(csv_file.fileno()).st_size == 0:
+            return None
+        csv_map: mmap.mmap = mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if csv_map.find(b'"') != -1 or (csv_map.find(b'\r') != -1 and re.search(rb'\r(?!\n)', csv_map)):
+            csv_map.close()
+            return None
+        return csv_map
+
+    @staticmethod
+    def split_lines(csv_map: mmap.mmap) -> Iterator[List[bytes]]:
+        """
+        Splits the lines of a memory-mapped csv file on commas, skipping empty
+        lines and a leading UTF-8 byte order mark.
+
+        :param csv_map: the memory-mapped csv file
+        :return: a stream of the rows of the csv file
+        """
+        if csv_map[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+            csv_map.seek(len(codecs.BOM_UTF8))
+        for line in iter(csv_map.readline, b''):
+            line = line.rstrip(b'\r\n')
+            if line:
+                yield line.split(b',')
+
+    def init_mapped_readers(self, stack: ExitStack) -> Optional[Tuple[Iterator[List[bytes]], Iterator[List[bytes]]]]:
+        """
+        Initializes readers over the memory-mapped before and after csv files.
+
+        :param stack: the exit stack that closes the csv files
+        :return: the before and after readers, or None if either csv file cannot be split on plain commas
+        """
+        csv_maps: List[mmap.mmap] = []
+        with ExitStack() as mapped_stack:
+            for path in (self.path_to_before_csv, self.path_to_after_csv):
+                csv_map: Optional[mmap.mmap] = self.map_csv_file(mapped_stack.enter_context(open(path, 'rb')))
+                if csv_map is None:
+                    # The files that were already mapped are closed on leaving the with block.
+                    return None
+                csv_maps.append(mapped_stack.enter_context(csv_map))
+            stack.push(mapped_stack.pop_all())
+        before_csv_map, after_csv_map = csv_maps
+        return self.split_lines(before_csv_map), self.split_lines(after_csv_map)
+
+    def intern_rows(self, csv_reader: Iterator[List[AnyStr]], caches: List[Dict[AnyStr, AnyStr]]) -> Iterator[Row]:
+        """
+        Converts the rows of a CSV file to tuples where repeated values of a
+        column (e.g. the brand or the currency) are a single shared string.
+        Once the cache of a column holds MAX_INTERNED_VALUES values, the column
+        is left as it is for the remaining rows.
+
+        :param csv_reader: the csv reader
+        :param caches: the interned values of each column
+        :return: a stream of rows with interned values
+        """
+        max_interned_values: int = self.MAX_INTERNED_VALUES
+        headers_cnt: int = len(caches)
+        interned_columns: List[Tuple[int, Dict[AnyStr, AnyStr]]] = list(enumerate(caches))
+        for row_cnt, row in enumerate(csv_reader, 1):
+            interned_row: List[AnyStr] = list(row)
+            if len(interned_row) >= headers_cnt:  # short rows are kept as they are
+                for idx, cache in interned_columns:
+                    cell: AnyStr = interned_row[idx]
+                    interned_row[idx] = cache.setdefault(cell, cell)
+            yield tuple(interned_row)
+            if row_cnt % max_interned_values == 0 and interned_columns:
+                interned_columns = [(idx, cache) for idx, cache in interned_columns if len(cache) < max_interned_values]
+
+    @staticmethod
+    def fingerprint(row: Sequence[AnyStr]) -> bytes:
+        """
+        Computes a 64-bit fingerprint of all cells of a row, so two rows can be
+        compared with a single comparison instead of cell by cell. The cells are
+        hashed joined by a unit separator; the rare rows that have a separator
+        inside a cell are hashed with the number and lengths of their cells too,
+        in another hash domain, so cells can't be shifted into each other.
+
+        :param row: the row of the CSV file
+        :return: the fingerprint of the row
+        """
+        joined: bytes = b'\x1f'.join(row) if isinstance(row[0], bytes) else '\x1f'.join(row).encode()
+        if joined.count(b'\x1f') == len(row) - 1:
+            return blake2b(joined, digest_size=8).digest()
+        cell_lengths = array('Q', [len(row)])
+        cell_lengths.extend(map(len, row))
+        return blake2b(cell_lengths.tobytes() + joined, digest_size=8, person=b'cell lengths').digest()
+
+    def load_fingerprints(self, csv_reader: Iterator[List[AnyStr]], id_idx: int) -> Dict[AnyStr, bytes]:
+        """
+        Loads the fingerprints of the products of a csv file in memory, indexed by product id.
+
+        :param csv_reader: the csv reader
+        :param id_idx: the index of the id column
+        :return: the product fingerprints indexed by product id
+        """
+        fingerprint: Callable[[Sequence[AnyStr]], bytes] = self.fingerprint
+        return {row[id_idx]: fingerprint(row) for row in csv_reader}
+
+    def load_products(
+        self,
+        csv_reader: Iterator[List[AnyStr]],
+        id_idx: int,
+        caches: List[Dict[AnyStr, AnyStr]],
+    ) -> Dict[AnyStr, Tuple[bytes, Row]]:
+        """
+        Loads the products of a csv file in memory, indexed by product id.
+
+        :param csv_reader: the csv reader
+        :param id_idx: the index of the id column
+        :param caches: the interned values of each column
+        :return: the fingerprints and products indexed by product id
+        """
+        fingerprint: Callable[[Sequence[AnyStr]], bytes] = self.fingerprint
+        return {row[id_idx]: (fingerprint(row), row) for row in self.intern_rows(csv_reader, caches)}
+
+    @staticmethod
+    def typed_converter(
+        parsers: Sequence[Tuple[Pattern, Callable[[str], Any]]],
+        to_text: Callable[[AnyStr], str],
+    ) -> Callable[[AnyStr], Any]:
+        """
+        Creates a converter that parses a cell with the first parser whose
+        pattern it matches, so e.g. an int column still parses a float found
+        after the sample as a float. Cells that match none of the patterns are
+        kept as text (e.g. when they are empty).
+
+        :param parsers: the patterns a cell may match and the functions that
+            parse the matching cells, from the narrowest type to the widest
+        :param to_text: the function that converts a cell to text
+        :return: the converter
+        """
+        def convert(cell: AnyStr) -> Any:
+            text: str = to_text(cell)
+            for pattern, parse in parsers:
+                if pattern.fullmatch(text):
+                    return parse(text)
+            return text
+        return convert
+
+    def infer_converters(
+        self,
+        headers: Headers,
+        id_idx: int,
+        sample: List[List[AnyStr]],
+        to_text: Callable[[AnyStr], str],
+    ) -> List[Callable[[AnyStr], Any]]:
+        """
+        Infers the narrowest type (int, float or text) of each column from a
+        sample of rows, and returns the converter that parses the cells of that
+        column into that type. The id column is always kept as text.
+
+        :param headers: the headers of the csv files
+        :param id_idx: the index of the id column
+        :param sample: the first rows of a csv file
+        :param to_text: the function that converts a cell to text
+        :return: the converter of each column
+        """
+        converters: List[Callable[[AnyStr], Any]] = []
+        for idx in range(len(headers)):
+            values: List[str] = [to_text(row[idx]) for row in sample if len(row) > idx and row[idx]]
+            if idx == id_idx or not values:
+                converters.append(to_text)
+            elif all(map(self.INT_PATTERN.fullmatch, values)):
+                converters.append(self.typed_converter(
+                    [(self.INT_PATTERN, int), (self.FLOAT_PATTERN, float)], to_text,
+                ))
+            elif all(map(self.FLOAT_PATTERN.fullmatch, values)):
+                converters.append(self.typed_converter([(self.FLOAT_PATTERN, float)], to_text))
+            else:
+                converters.append(to_text)
+        return converters
+
+    @staticmethod
+    def to_product_data(headers: Headers, converters: List[Callable[[AnyStr], Any]], row: Row) -> Dict[str, Any]:
+        """
+        Converts a row of the CSV file to a dictionary with the complete product data.
+
+        :param headers: the headers of the CSV file
+        :param converters: the converter of each column
+        :param row: the row of the CSV file
+        :return: the product data where the keys are the column names
+        """
+        return dict(zip(headers, [convert(cell) for convert, cell in zip(converters, row)]))
+
+    def compile_product_data_builder(
+        self,
+        headers: Headers,
+        converters: List[Callable[[AnyStr], Any]],
+    ) -> Callable[[Row], Dict[str, Any]]:
+        """
+        Generates a function specialized for the headers that converts a row to
+        a dictionary with the complete product data, e.g.
+        `lambda row: {'id': row[0], 'price': convert_1(row[1])}`. The column
+        names and indices are constants in the generated code, so building a
+        product takes a single dict display instead of zipping the headers.
+        Rows with a different number of cells than headers fall back to
+        `to_product_data`.
+
+        :param headers: the headers of the CSV file
+        :param converters: the converter of each column
+        :return: the function that converts a row to the product data
+        """
+        namespace: Dict[str, Any] = {'fallback': partial(self.to_product_data, headers, converters)}
+        items: List[str] = []
+        for idx, (header, convert) in enumerate(zip(headers, converters)):
+            if convert is str:  # str rows are already text
+                items.append(f'{header!r}: row[{idx}]')
+            else:
+                namespace[f'convert_{idx}'] = convert
+                items.append(f'{header!r}: convert_{idx}(row[{idx}])')
+        source: str = (
+            f'def to_product_data(row):\n'
+            f'    if len(row) != {len(headers)}:\n'
+            f'        return fallback(row)\n'
+            f'    return {{{", ".join(items)}}}\n'
+        )
+        exec(source, namespace)
+        return namespace['to_product_data']
+
+    def read_headers(self, before_csv_reader: Iterator[List[AnyStr]], after_csv_reader: Iterator[List[AnyStr]]) -> Row:
+        """
+        Reads the headers (first row) of the before and after csv files, which
+        must be the same as the products of both files are diffed column by column.
+
+        :param before_csv_reader: the before csv reader
+        :param after_csv_reader: the after csv reader
+        :return: the headers of the csv files
+        """
+        before_headers: Optional[List[AnyStr]] = next(before_csv_reader, None)
+        after_headers: Optional[List[AnyStr]] = next(after_csv_reader, None)
+        if before_headers is None or after_headers is None:
+            empty_path: str = self.path_to_before_csv if before_headers is None else self.path_to_after_csv
+            raise ValueError(f'{empty_path} is empty, expected at least a header row')
+        if before_headers != after_headers:
+            raise ValueError(
+                f'The headers of {self.path_to_before_csv} and {self.path_to_after_csv} differ: '
+                f'{before_headers!r} != {after_headers!r}'
+            )
+        return tuple(after_headers)
+
+    def check_sorted(self, csv_reader: Iterator[List[AnyStr]], id_idx: int, path: str) -> Iterator[List[AnyStr]]:
+        """
+        Passes the rows of a csv file through while checking that they are sorted by id.
+
+        :param csv_reader: the csv reader
+        :param id_idx: the index of the id column
+        :param path: the path of the csv file, used in the error message
+        :return: a stream of the rows of the csv file
+        """
+        previous_id: Optional[AnyStr] = None
+        for row in csv_reader:
+            product_id: AnyStr = row[id_idx]
+            if previous_id is not None and product_id <= previous_id:
+                raise ValueError(
+                    f'{path} is not sorted by {self.ID_COLUMN}: {product_id!r} comes after {previous_id!r}'
+                )
+            previous_id = product_id
+            yield row
+
     def prepare_data(
         self,
-        before_csv_reader: csv.reader,
-        after_csv_reader: csv.reader,
-    ) -> Tuple[List[Dict[str, Union[Dict[str, Any], int]]], List[Dict[str, Union[Dict[str, Any], int]]]]:
+        headers: Headers,
+        id_idx: int,
+        before_csv_reader: Iterator[List[AnyStr]],
+        after_csv_reader: Iterator[List[AnyStr]],
+    ) -> Tuple[Dict[AnyStr, bytes], Dict[AnyStr, Tuple[bytes, Row]]]:
         """
         Prepares the data for the differ.
 
+        Before products are never emitted, so only their fingerprint is kept.
+        After products are kept as plain tuples of interned cells which share a
+        single header row; a dictionary is only built for the products that are
+        emitted. Both csv files are loaded in separate threads. Parsing holds
+        the GIL, so the threads can only overlap while one of them waits for the
+        disk; with the files in the page cache this was measured no faster
+        than loading them one after the other.
+
+        :param headers: the headers of the csv files
+        :param id_idx: the index of the id column
         :param before_csv_reader: the before csv reader
         :param after_csv_reader: the after csv reader
-        :return: the before and after data
+        :return: the before fingerprints and the after fingerprints and products, indexed by product id
         """
-        next(before_csv_reader)  # We need to skip the headers (first row)
-        file_headers: List[str] = next(after_csv_reader)  # We need to skip the headers (first row)
-        before_csv_products: List[Dict[str, Dict[str, Any]]] = self.convert_data_from_csv(
-            before_csv_reader,
-            file_headers,
-        )
-        after_csv_products: List[Dict[str, Dict[str, Any]]] = self.convert_data_from_csv(
-            after_csv_reader,
-            file_headers,
-        )
-        return before_csv_products, after_csv_products
+        caches: List[Dict[AnyStr, AnyStr]] = [{} for _ in headers]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            before_csv_products: Future = executor.submit(self.load_fingerprints, before_csv_reader, id_idx)
+            after_csv_products: Future = executor.submit(self.load_products, after_csv_reader, id_idx, caches)
+            return before_csv_products.result(), after_csv_products.result()
+
+    def diff_indexed(
+        self,
+        headers: Headers,
+        id_idx: int,
+        before_csv_reader: Iterator[List[AnyStr]],
+        after_csv_reader: Iterator[List[AnyStr]],
+    ) -> Iterator[RawOperation]:
+        """
+        Creates the stream of operations by indexing both csv files by id and
+        looking up every before product in the after products, in a single pass
+        in file order. The csv files may be in any order.
+
+        :param headers: the headers of the csv files
+        :param id_idx: the index of the id column
+        :param before_csv_reader: the before csv reader
+        :param after_csv_reader: the after csv reader
+        :return: a stream of operations with the raw product rows
+        """
+        before_fingerprints, after_products = self.prepare_data(headers, id_idx, before_csv_reader, after_csv_reader)
+        # Deleted products are the ones whose pop misses. A separate
+        # before.keys() - after.keys() loop would give them in hash order
+        # and was measured slower than this one pass over the before products.
+        for product_id, before_fingerprint in before_fingerprints.items():
+            after_product: Optional[Tuple[bytes, Row]] = after_products.pop(product_id, None)
+            if after_product is None:
+                yield Operation.DELETE, product_id, None
+            elif after_product[0] != before_fingerprint:
+                yield Operation.UPDATE, product_id, after_product[1]
+
+        # Matched products were popped above, so only the products that
+        # are new in the after csv file are left.
+        for product_id, (_, after_row) in after_products.items():
+            yield Operation.CREATE, product_id, after_row
+
+    def diff_sorted(
+        self,
+        headers: Headers,
+        id_idx: int,
+        before_csv_reader: Iterator[List[AnyStr]],
+        after_csv_reader: Iterator[List[AnyStr]],
+    ) -> Iterator[RawOperation]:
+        """
+        Creates the stream of operations by merging the before and after csv
+        files, which must both be sorted by id (in string order). Only the
+        current row of each file is kept in memory, so the csv files may be
+        larger than the available memory. A ValueError is raised as soon as a
+        row is found out of order.
+
+        :param headers: the headers of the csv files
+        :param id_idx: the index of the id column
+        :param before_csv_reader: the before csv reader
+        :param after_csv_reader: the after csv reader
+        :return: a stream of operations with the raw product rows
+        """
+        before_rows: Iterator[List[AnyStr]] = self.check_sorted(before_csv_reader, id_idx, self.path_to_before_csv)
+        after_rows: Iterator[List[AnyStr]] = self.check_sorted(after_csv_reader, id_idx, self.path_to_after_csv)
+        before_row: Optional[List[AnyStr]] = next(before_rows, None)
+        after_row: Optional[List[AnyStr]] = next(after_rows, None)
+        while before_row is not None and after_row is not None:
+            before_id: AnyStr = before_row[id_idx]
+            after_id: AnyStr = after_row[id_idx]
+            if before_id < after_id:
+                yield Operation.DELETE, before_id, None
+                before_row = next(before_rows, None)
+            elif before_id > after_id:
+                yield Operation.CREATE, after_id, after_row
+                after_row = next(after_rows, None)
+            else:
+                if before_row != after_row:
+                    yield Operation.UPDATE, after_id, after_row
+                before_row = next(before_rows, None)
+                after_row = next(after_rows, None)
+
+        # At most one of the csv files has rows left.
+        while before_row is not None:
+            yield Operation.DELETE, before_row[id_idx], None
+            before_row = next(before_rows, None)
+        while after_row is not None:
+            yield Operation.CREATE, after_row[id_idx], after_row
+            after_row = next(after_rows, None)
+
+    def diff(
+        self,
+        before_csv_reader: Iterator[List[AnyStr]],
+        after_csv_reader: Iterator[List[AnyStr]],
+    ) -> Iterator[Tuple[Operation, str, Optional[Dict[str, Any]]]]:
+        """
+        Creates the stream of operations for the rows of the before and after
+        csv files. The values of the emitted products are parsed into the type
+        of their column, and decoded if the rows are bytes.
+
+        :param before_csv_reader: the before csv reader
+        :param after_csv_reader: the after csv reader
+        :return: a stream of operations
+        """
+        raw_headers: Row = self.read_headers(before_csv_reader, after_csv_reader)
+        binary: bool = isinstance(raw_headers[0], bytes)
+        headers: Headers = tuple(map(bytes.decode, raw_headers)) if binary else raw_headers
+        if self.ID_COLUMN not in headers:
+            raise ValueError(
+                f'{self.path_to_before_csv} and {self.path_to_after_csv} have no {self.ID_COLUMN!r} column: {headers!r}'
+            )
+        id_idx: int = headers.index(self.ID_COLUMN)
+        to_text: Callable[[AnyStr], str] = bytes.decode if binary else str
+        sample: List[List[AnyStr]] = list(islice(after_csv_reader, self.TYPE_SAMPLE_SIZE))
+        converters: List[Callable[[AnyStr], Any]] = self.infer_converters(headers, id_idx, sample, to_text)
+        after_csv_reader = chain(sample, after_csv_reader)
+
+        to_product_data: Callable[[Row], Dict[str, Any]] = self.compile_product_data_builder(headers, converters)
+        diff_rows = self.diff_sorted if self.sorted_input else self.diff_indexed
+        for operation, product_id, row in diff_rows(headers, id_idx, before_csv_reader, after_csv_reader):
+            product_data = None if row is None else to_product_data(row)
+            yield operation, to_text(product_id), product_data
 
     def main(self) -> Iterator[Tuple[Operation, str, Optional[Dict[str, Any]]]]:
         """
@@ -168,17 +588,12 @@ class ProductDiffer(ProductStreamProcessor):
 
         :return: a stream of operations
         """
-        with open(self.path_to_before_csv, 'r') as before_csv_file, open(self.path_to_after_csv, 'r') as after_csv_file:
-            before_csv_reader, after_csv_reader = self.init_file_readers(before_csv_file, after_csv_file)
-            before_products, after_products = self.prepare_data(before_csv_reader, after_csv_reader)
-            for before_product in before_products:
-                suitable_product = self.find_suitable_product(after_products, before_product['id'])
-                if suitable_product is not None:
-                    yield Operation.UPDATE, before_product['id'], suitable_product['data']
-                else:
-                    yield Operation.DELETE, before_product['id'], None
-
-            for after_product in after_products:
-                suitable_product = self.find_suitable_product(before_products, after_product['id'])
-                if suitable_product is None:
-                    yield Operation.CREATE, after_product['id'], after_product['data']
+        with ExitStack() as stack:
+            csv_readers: Optional[Tuple[Iterator[List[AnyStr]], Iterator[List[AnyStr]]]] = None
+            if self.fast_ascii:
+                csv_readers = self.init_mapped_readers(stack)
+            if csv_readers is None:
+                before_csv_file: TextIO = stack.enter_context(self.open_csv_file(self.path_to_before_csv))
+                after_csv_file: TextIO = stack.enter_context(self.open_csv_file(self.path_to_after_csv))
+                csv_readers = self.init_file_readers(before_csv_file, after_csv_file)
+            yield from self.diff(*csv_readers)
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import unittest
+from typing import Any, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+from assignment import Operation, ProductDiffer
+
+# Every way the differ can read the csv files; they must all give the same operations.
+READ_MODES: List[Dict[str, bool]] = [
+    {},
+    {'sorted_input': True},
+    {'fast_ascii': True},
+    {'sorted_input': True, 'fast_ascii': True},
+]
+
+
+class ProductDifferTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def write_csv(self, name: str, content: str) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as csv_file:
+            csv_file.write(content)
+        return path
+
+    def diff(self, before: str, after: str, **kwargs: bool) -> List[Tuple[Operation, str, Optional[Dict[str, Any]]]]:
+        before_path = self.write_csv('before.csv', before)
+        after_path = self.write_csv('after.csv', after)
+        return list(ProductDiffer(before_path, after_path, **kwargs).main())
+
+    def assert_all_modes(self, before: str, after: str, expected: List[Tuple[Operation, str, Any]]):
+        for read_mode in READ_MODES:
+            with self.subTest(**read_mode):
+                operations = self.diff(before, after, **read_mode)
+                self.assertCountEqual(operations, expected)
+
+    def assert_all_modes_raise(self, before: str, after: str, message: str):
+        for read_mode in READ_MODES:
+            with self.subTest(**read_mode):
+                with self.assertRaisesRegex(ValueError, message):
+                    self.diff(before, after, **read_mode)
+
+    def test_create_update_delete(self):
+        before = 'id,name,price\n1,shoe,10.5\n2,hat,3\n3,sock,1\n'
+        after = 'id,name,price\n1,shoe,10.5\n2,hat,4\n4,scarf,7\n'
+        self.assert_all_modes(before, after, [
+            (Operation.UPDATE, '2', {'id': '2', 'name': 'hat', 'price': 4}),
+            (Operation.DELETE, '3', None),
+            (Operation.CREATE, '4', {'id': '4', 'name': 'scarf', 'price': 7}),
+        ])
+
+    def test_operations_are_in_file_order(self):
+        before = 'id,name\n3,c\n1,a\n2,b\n5,e\n'
+        after = 'id,name\n6,f\n2,x\n1,y\n4,d\n'
+        self.assertEqual(self.diff(before, after), [
+            (Operation.DELETE, '3', None),
+            (Operation.UPDATE, '1', {'id': '1', 'name': 'y'}),
+            (Operation.UPDATE, '2', {'id': '2', 'name': 'x'}),
+            (Operation.DELETE, '5', None),
+            (Operation.CREATE, '6', {'id': '6', 'name': 'f'}),
+            (Operation.CREATE, '4', {'id': '4', 'name': 'd'}),
+        ])
+
+    def test_header_mismatch(self):
+        self.assert_all_modes_raise('id,name\n1,a\n', 'id,title\n1,a\n', 'headers .* differ')
+
+    def test_empty_file(self):
+        self.assert_all_modes_raise('', 'id,name\n1,a\n', 'before.csv is empty')
+        self.assert_all_modes_raise('id,name\n1,a\n', '', 'after.csv is empty')
+
+    def test_missing_id_column(self):
+        self.assert_all_modes_raise('sku,name\n1,a\n', 'sku,name\n1,b\n', "no 'id' column")
+
+    def test_unsorted_input(self):
+        with self.assertRaisesRegex(ValueError, 'not sorted'):
+            self.diff('id,name\n2,a\n1,b\n', 'id,name\n1,b\n', sorted_input=True)
+
+    def test_leading_zeros_stay_text(self):
+        self.assert_all_modes('id,zip\n', 'id,zip\n1,01234\n2,00001\n', [
+            (Operation.CREATE, '1', {'id': '1', 'zip': '01234'}),
+            (Operation.CREATE, '2', {'id': '2', 'zip': '00001'}),
+        ])
+
+    @patch.object(ProductDiffer, 'TYPE_SAMPLE_SIZE', 1)
+    def test_values_after_the_sample_that_are_not_plain_numbers_stay_text(self):
+        before = 'id,count,price\n'
+        after = 'id,count,price\n1,5,1.5\n2,007,nan\n3,1_000,1e3\n4,,\n'
+        self.assert_all_modes(before, after, [
+            (Operation.CREATE, '1', {'id': '1', 'count': 5, 'price': 1.5}),
+            (Operation.CREATE, '2', {'id': '2', 'count': '007', 'price': 'nan'}),
+            (Operation.CREATE, '3', {'id': '3', 'count': '1_000', 'price': '1e3'}),
+            (Operation.CREATE, '4', {'id': '4', 'count': '', 'price': ''}),
+        ])
+
+    def test_int_column_parses_floats_after_the_sample(self):
+        sample_ids = range(1000, 1000 + ProductDiffer.TYPE_SAMPLE_SIZE)
+        after = 'id,price\n' + ''.join('{0},{0}\n'.format(idx) for idx in sample_ids) + '1100,10.5\n'
+        self.assert_all_modes('id,price\n', after, [
+            (Operation.CREATE, str(idx), {'id': str(idx), 'price': idx}) for idx in sample_ids
+        ] + [
+            (Operation.CREATE, '1100', {'id': '1100', 'price': 10.5}),
+        ])
+
+    @patch.object(ProductDiffer, 'TYPE_SAMPLE_SIZE', 1)
+    def test_negative_zero_stays_text(self):
+        self.assert_all_modes('id,a,b\n', 'id,a,b\n1,1,1.5\n2,-0,-0\n', [
+            (Operation.CREATE, '1', {'id': '1', 'a': 1, 'b': 1.5}),
+            (Operation.CREATE, '2', {'id': '2', 'a': '-0', 'b': '-0'}),
+        ])
+
+    @patch.object(ProductDiffer, 'MAX_INTERNED_VALUES', 2)
+    def test_columns_with_many_values_are_no_longer_interned(self):
+        rows = [[str(idx), ''.join(['ac', 'me'])] for idx in range(6)]
+        caches = [{}, {}]
+        interned_rows = list(ProductDiffer('before.csv', 'after.csv').intern_rows(iter(rows), caches))
+        self.assertEqual(interned_rows, [tuple(row) for row in rows])
+        self.assertEqual(len(caches[0]), 2)
+        self.assertEqual(len(caches[1]), 1)
+        self.assertTrue(all(row[1] is interned_rows[0][1] for row in interned_rows))
+
+    def test_trailing_comma_is_not_an_update(self):
+        self.assert_all_modes('id,a\n1,x,\n', 'id,a\n1,x,\n', [])
+
+    def test_blank_lines_are_skipped(self):
+        self.assert_all_modes('id,a\n1,x\n\n2,y\n\n', 'id,a\n1,z\n', [
+            (Operation.UPDATE, '1', {'id': '1', 'a': 'z'}),
+            (Operation.DELETE, '2', None),
+        ])
+
+    def test_moving_a_separator_between_cells_is_an_update(self):
+        self.assert_all_modes('id,a,b\n1,p\x1fq,r\n', 'id,a,b\n1,p,q\x1fr\n', [
+            (Operation.UPDATE, '1', {'id': '1', 'a': 'p', 'b': 'q\x1fr'}),
+        ])
+
+    def test_carriage_return_line_endings(self):
+        self.assert_all_modes('id,a\r\n1,x\r\n2,y\r\n', 'id,a\r1,x\r2,z\r', [
+            (Operation.UPDATE, '2', {'id': '2', 'a': 'z'}),
+        ])
+
+    def test_rows_with_missing_or_extra_cells(self):
+        self.assert_all_modes('id,a,b\n', 'id,a,b\n1,x\n2,y,3\n3,z,4,extra\n', [
+            (Operation.CREATE, '1', {'id': '1', 'a': 'x'}),
+            (Operation.CREATE, '2', {'id': '2', 'a': 'y', 'b': 3}),
+            (Operation.CREATE, '3', {'id': '3', 'a': 'z', 'b': 4}),
+        ])
+
+    def test_byte_order_mark_is_skipped(self):
+        self.assert_all_modes('\ufeffid,a\n1,x\n', '\ufeffid,a\n1,y\n', [
+            (Operation.UPDATE, '1', {'id': '1', 'a': 'y'}),
+        ])
+
+    def test_quoted_values(self):
+        self.assert_all_modes('id,"na""me"\n1,"a,b"\n', 'id,"na""me"\n1,"a,c"\n', [
+            (Operation.UPDATE, '1', {'id': '1', 'na"me': 'a,c'}),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()